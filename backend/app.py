@@ -4,41 +4,76 @@ Main Flask Application for the Church Website
 
 import os
 import logging
+import orjson
 from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_mail import Mail
 
 from .config import Config
-from .models import init_db
-from .routes import api
+from .mailer import start_mail_worker
+from .models import init_app as init_db_app, init_db, schedule_maintenance
+from .routes import api, configure as configure_routes
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, used by jsonify() and request.json
+
+    Calls passing options (e.g. the session serializer's separators and
+    object_hook) fall back to the stdlib json provider.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype=self.mimetype)
 
 def create_app():
     """Create and configure the Flask application"""
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     app.config.from_object(Config)
+    configure_routes(app)
 
     # Setup CORS
     CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
 
-    # Setup Mail
-    mail = Mail(app)
-    app.extensions["mail"] = mail
-
-    # Setup Logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('church_app.log'),
-            logging.StreamHandler()
-        ]
-    )
+    # Setup Mail (only when an SMTP account is configured)
+    if app.config['MAIL_USERNAME']:
+        mail = Mail(app)
+        app.extensions["mail"] = mail
+
+    # Setup Logging (once per process, so repeated app creation
+    # doesn't open another log file handle)
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('church_app.log'),
+                logging.StreamHandler()
+            ]
+        )
     logger = logging.getLogger(__name__)
 
     # Initialize database
+    init_db_app(app)
     with app.app_context():
         init_db()
         logger.info("Database initialized")
+    schedule_maintenance(app.config['DATABASE'], app.config['DB_MAINTENANCE_INTERVAL'])
+
+    # Send email notifications off the request path
+    if app.config['MAIL_USERNAME']:
+        app.extensions['mail_queue'] = start_mail_worker(app)
 
     # Register blueprint
     app.register_blueprint(api, url_prefix='/api')
@@ -48,6 +83,10 @@ def create_app():
     def not_found(error):
         return jsonify({'error': 'Resource not found'}), 404
 
+    @app.errorhandler(413)
+    def payload_too_large(error):
+        return jsonify({'error': 'Request payload too large'}), 413
+
     @app.errorhandler(500)
     def internal_error(error):
         logger.error(f"Internal server error: {error}")
@@ -56,9 +95,12 @@ def create_app():
     return app
 
 if __name__ == '__main__':
+    # The built-in server is for development only; production runs under
+    # gunicorn with backend/gunicorn.conf.py
+    if os.environ.get('FLASK_ENV') != 'development':
+        raise SystemExit(
+            'Set FLASK_ENV=development to use the development server, or run: '
+            'gunicorn -c backend/gunicorn.conf.py "backend.app:create_app()"'
+        )
     app = create_app()
-    app.run(
-        host='0.0.0.0',
-        port=5000,
-        debug=os.environ.get('FLASK_ENV') == 'development'
-    )
+    app.run(host='0.0.0.0', port=5000, debug=True)
@@ -3,11 +3,16 @@ Configuration for the Church Website
 """
 
 import os
+from werkzeug.security import generate_password_hash
 
 class Config:
     """Application configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     DATABASE = os.environ.get('DATABASE') or 'church.db'
+    DB_MAINTENANCE_INTERVAL = int(os.environ.get('DB_MAINTENANCE_INTERVAL') or 86400)  # seconds
+    # Idle SQLite connections kept per worker; match the gunicorn threads per worker
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or os.environ.get('GUNICORN_THREADS') or 32)
+    DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE') or 512)  # sqlite3 default is 128
     
     # Flask-Mail configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
@@ -22,9 +27,19 @@ class Config:
     
     # Admin credentials (change in production)
     ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME') or 'admin'
-    ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD') or 'admin123'
+    # Only the hash is kept; the plaintext is never stored on the class
+    ADMIN_PASSWORD_HASH = generate_password_hash(os.environ.get('ADMIN_PASSWORD') or 'admin123')
     
     # Rate limiting
     RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ['true', '1', 'yes']
     RATE_LIMIT_REQUESTS = int(os.environ.get('RATE_LIMIT_REQUESTS') or 100)
     RATE_LIMIT_PERIOD = int(os.environ.get('RATE_LIMIT_PERIOD') or 3600)  # seconds
+    
+    # Largest accepted request body
+    MAX_PAYLOAD_BYTES = int(os.environ.get('MAX_PAYLOAD_BYTES') or 8192)
+    # Werkzeug stops reading chunked bodies here; one byte past the cap
+    # tells a body at the cap from one over it
+    MAX_CONTENT_LENGTH = MAX_PAYLOAD_BYTES + 1
+    
+    # Cache lifetime for GET /api/services and /api/announcements
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL') or 60)  # seconds
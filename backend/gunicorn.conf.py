@@ -0,0 +1,15 @@
+"""
+Gunicorn configuration for the Church Website
+
+Run from the repository root:
+    gunicorn -c backend/gunicorn.conf.py "backend.app:create_app()"
+"""
+
+import os
+
+bind = os.environ.get('BIND') or '0.0.0.0:5000'
+
+# Threaded workers: requests block on SQLite and SMTP, not CPU
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY') or 4)
+threads = int(os.environ.get('GUNICORN_THREADS') or 32)
@@ -0,0 +1,134 @@
+"""
+Background email delivery for the Church Website
+"""
+
+import logging
+import queue
+import threading
+from flask import current_app
+from flask_mail import Message
+
+from .models import get_db
+
+logger = logging.getLogger(__name__)
+
+# Delay before retrying a failed send, doubled per attempt up to the max
+RETRY_BASE_DELAY = 60  # seconds
+RETRY_MAX_DELAY = 3600  # seconds
+
+# Sends per email before it is left in the outbox as failed
+MAX_SEND_ATTEMPTS = 10
+
+# A claim older than this belongs to a worker that died mid-send
+CLAIM_TIMEOUT = 600  # seconds
+
+# How often an idle worker looks for due retries and abandoned claims
+OUTBOX_POLL_INTERVAL = 30  # seconds
+
+# Unsent emails that are due and not being sent by a live worker
+DUE_MAIL_SQL = '''
+    SELECT id FROM mail_outbox
+    WHERE is_sent = 0 AND attempts < ? AND next_attempt_at <= CURRENT_TIMESTAMP
+      AND (claimed_at IS NULL OR claimed_at < datetime('now', ?))
+    ORDER BY id
+'''
+
+# Same conditions as DUE_MAIL_SQL, so two workers can't claim one email
+CLAIM_MAIL_SQL = '''
+    UPDATE mail_outbox SET claimed_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+    WHERE id = ? AND is_sent = 0 AND attempts < ? AND next_attempt_at <= CURRENT_TIMESTAMP
+      AND (claimed_at IS NULL OR claimed_at < datetime('now', ?))
+    RETURNING subject, recipients, body, attempts
+'''
+
+def queue_mail(conn, subject, recipients, body):
+    """Store an outgoing email in the outbox and return its id
+
+    The caller commits the row and then hands the id to the mail queue.
+    """
+    return conn.execute(
+        'INSERT INTO mail_outbox (subject, recipients, body) VALUES (?, ?, ?) RETURNING id',
+        (subject, ','.join(recipients), body)
+    ).fetchone()[0]
+
+def start_mail_worker(app):
+    """Start the background sender and return its queue of outbox ids
+
+    Emails left unsent by a previous process, including ones it was in
+    the middle of sending, are queued again by the worker's outbox scan.
+    """
+    mail_queue = queue.Queue()
+    worker = threading.Thread(
+        target=_mail_worker, args=(app, mail_queue), name='mail-worker', daemon=True
+    )
+    worker.start()
+    return mail_queue
+
+def _mail_worker(app, mail_queue):
+    """Send queued emails one at a time, forever
+
+    Whenever the queue stays empty for a poll interval, the outbox is
+    scanned for emails due a retry or abandoned mid-send.
+    """
+    scan = True
+    while True:
+        if scan:
+            try:
+                with app.app_context():
+                    for mail_id in _due_mail_ids():
+                        mail_queue.put(mail_id)
+            except Exception as e:
+                logger.warning(f"Failed to scan the mail outbox: {e}")
+        try:
+            mail_id = mail_queue.get(timeout=OUTBOX_POLL_INTERVAL)
+        except queue.Empty:
+            scan = True
+            continue
+        scan = False
+        try:
+            with app.app_context():
+                _send(mail_id)
+        except Exception as e:
+            logger.warning(f"Failed to send email notification {mail_id}: {e}")
+        finally:
+            mail_queue.task_done()
+
+def _due_mail_ids():
+    """Ids of outbox rows ready to be sent"""
+    with get_db() as conn:
+        return [mail_id for (mail_id,) in conn.execute(
+            DUE_MAIL_SQL, (MAX_SEND_ATTEMPTS, f'-{CLAIM_TIMEOUT} seconds')
+        )]
+
+def _send(mail_id):
+    """Claim one outbox row and send it
+
+    The row is only marked sent once the SMTP call returns; a failed send
+    releases the claim and schedules the next attempt with backoff.
+    """
+    with get_db() as conn:
+        claimed = conn.execute(
+            CLAIM_MAIL_SQL, (mail_id, MAX_SEND_ATTEMPTS, f'-{CLAIM_TIMEOUT} seconds')
+        ).fetchone()
+        conn.commit()
+        if claimed is None:
+            return
+        subject, recipients, body, attempts = claimed
+
+        try:
+            current_app.extensions['mail'].send(
+                Message(subject, recipients=recipients.split(','), body=body)
+            )
+        except Exception:
+            delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+            conn.execute(
+                "UPDATE mail_outbox SET claimed_at = NULL, next_attempt_at = datetime('now', ?) WHERE id = ?",
+                (f'+{delay} seconds', mail_id)
+            )
+            conn.commit()
+            if attempts >= MAX_SEND_ATTEMPTS:
+                logger.error(f"Giving up on email notification {mail_id} after {attempts} attempts")
+            raise
+
+        conn.execute('UPDATE mail_outbox SET is_sent = 1, claimed_at = NULL WHERE id = ?', (mail_id,))
+        conn.commit()
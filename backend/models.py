@@ -2,23 +2,179 @@
 Database models for the Church Website
 """
 
+import atexit
+import logging
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
-from flask import current_app
+from flask import current_app, g
+
+logger = logging.getLogger(__name__)
+
+# Per-connection tuning; these settings do not persist in the database file
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA foreign_keys=ON',
+    'PRAGMA busy_timeout=5000',
+)
+
+# Database files already switched to WAL (journal_mode is persistent)
+_wal_databases = set()
+
+# Idle connection pools keyed by database path
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Database files with a maintenance timer running
+_maintained_databases = set()
+
+def connect(database, cached_statements=128):
+    """Open a tuned SQLite connection
+
+    Write statements implicitly start a BEGIN IMMEDIATE transaction, so
+    concurrent writers queue on busy_timeout up front instead of failing
+    when a deferred read lock is upgraded.
+    """
+    conn = sqlite3.connect(
+        database,
+        check_same_thread=False,
+        cached_statements=cached_statements,
+        isolation_level='IMMEDIATE'
+    )
+    if database not in _wal_databases:
+        conn.execute('PRAGMA journal_mode=WAL')
+        _wal_databases.add(database)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def close(conn):
+    """Let SQLite refresh planner statistics, then close the connection"""
+    try:
+        conn.execute('PRAGMA optimize')
+    except sqlite3.Error:
+        pass
+    conn.close()
+
+def _get_pool(database):
+    """Return the idle connection pool for a database file
+
+    The pool is sized from the app's DB_POOL_SIZE when first created.
+    """
+    pool = _pools.get(database)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(database)
+            if pool is None:
+                pool = _pools[database] = queue.LifoQueue(maxsize=current_app.config['DB_POOL_SIZE'])
+    return pool
+
+def _checkout(database):
+    """Take an idle connection from the pool or open a new one"""
+    try:
+        return _get_pool(database).get_nowait()
+    except queue.Empty:
+        return connect(database, current_app.config['DB_STATEMENT_CACHE_SIZE'])
+
+def _release(database, conn):
+    """Return a connection to the pool, closing it if the pool is full"""
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _get_pool(database).put_nowait(conn)
+    except queue.Full:
+        close(conn)
+
+@atexit.register
+def close_pools():
+    """Close every idle pooled connection"""
+    for pool in list(_pools.values()):
+        while True:
+            try:
+                close(pool.get_nowait())
+            except queue.Empty:
+                break
 
 @contextmanager
 def get_db():
-    """Database connection context manager"""
-    conn = sqlite3.connect(current_app.config['DATABASE'])
-    conn.row_factory = sqlite3.Row
+    """Database connection context manager
+
+    The first call in an app context checks a connection out of the
+    per-database pool; later calls in the same request reuse it. It goes
+    back to the pool when the app context is torn down.
+    """
+    conn = g.get('db')
+    if conn is None:
+        conn = g.db = _checkout(current_app.config['DATABASE'])
+    yield conn
+
+def release_db(exception=None):
+    """Return the app context's connection to the pool"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        _release(current_app.config['DATABASE'], conn)
+
+def init_app(app):
+    """Register database teardown with the application"""
+    app.teardown_appcontext(release_db)
+
+def run_maintenance(database):
+    """Refresh planner statistics and truncate the WAL file"""
+    conn = connect(database)
     try:
-        yield conn
+        conn.execute('ANALYZE')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
     finally:
         conn.close()
 
+def schedule_maintenance(database, interval):
+    """Run run_maintenance() on a background timer every interval seconds"""
+    def tick():
+        try:
+            run_maintenance(database)
+        except sqlite3.Error as e:
+            logger.error(f"Database maintenance failed: {e}")
+        start()
+
+    def start():
+        timer = threading.Timer(interval, tick)
+        timer.daemon = True
+        timer.start()
+
+    with _pools_lock:
+        if database in _maintained_databases:
+            return
+        _maintained_databases.add(database)
+    start()
+
+# Sample data loaded into a fresh database
+SEED_EVENTS = [
+    ('Community Outreach', 'Join us as we serve our local community with food and fellowship.', '2024-12-15', '10:00 AM', 'Church Parking Lot'),
+    ('Christmas Eve Service', 'Celebrate the birth of Christ with candlelight and carols.', '2024-12-24', '7:00 PM', 'Main Sanctuary'),
+    ('Youth Winter Retreat', 'A weekend of fun, fellowship, and spiritual growth for teens.', '2025-01-10', '6:00 PM', 'Mountain View Camp'),
+    ('New Year Prayer Meeting', 'Start the year with prayer and worship.', '2025-01-01', '10:00 PM', 'Prayer Room'),
+]
+
+SEED_SERVICES = [
+    ('Sunday', '9:00 AM', 'Traditional', 'Traditional worship with hymns and organ music'),
+    ('Sunday', '11:00 AM', 'Contemporary', 'Modern worship with contemporary music'),
+    ('Wednesday', '7:00 PM', 'Bible Study', 'Mid-week Bible study and prayer meeting'),
+    ('Sunday', '10:00 AM', 'Sunday School', 'Classes for all ages'),
+]
+
+SEED_ANNOUNCEMENTS = [
+    ('Welcome to Our New Website!', 'We are excited to launch our new church website. Explore all the features and stay connected!', '2024-12-31'),
+    ('Christmas Schedule', 'Join us for special Christmas services throughout December. Check our events page for details.', '2024-12-26'),
+]
+
 def init_db():
     """Initialize database with tables"""
     with get_db() as conn:
+        # Phase 1: tables
         conn.executescript('''
             -- Events table
             CREATE TABLE IF NOT EXISTS events (
@@ -32,7 +188,6 @@ def init_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_events_date ON events(date);
             
             -- Services table
             CREATE TABLE IF NOT EXISTS services (
@@ -53,7 +208,6 @@ def init_db():
                 message TEXT NOT NULL,
                 date_submitted TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
-            CREATE INDEX IF NOT EXISTS idx_contacts_email ON contacts(email);
             
             -- Prayer requests table
             CREATE TABLE IF NOT EXISTS prayer_requests (
@@ -74,7 +228,6 @@ def init_db():
                 expiry_date DATE,
                 is_active BOOLEAN DEFAULT 1
             );
-            CREATE INDEX IF NOT EXISTS idx_announcements_date ON announcements(date_posted);
             
             -- Newsletter subscriptions table
             CREATE TABLE IF NOT EXISTS newsletter (
@@ -83,31 +236,56 @@ def init_db():
                 date_subscribed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 is_active BOOLEAN DEFAULT 1
             );
-            CREATE INDEX IF NOT EXISTS idx_newsletter_email ON newsletter(email);
             
-            -- Rate limiting table
-            CREATE TABLE IF NOT EXISTS rate_limits (
-                ip_address TEXT NOT NULL,
-                endpoint TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (ip_address, endpoint, timestamp)
+            -- Outgoing email notifications
+            CREATE TABLE IF NOT EXISTS mail_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                subject TEXT NOT NULL,
+                recipients TEXT NOT NULL,
+                body TEXT NOT NULL,
+                is_sent BOOLEAN DEFAULT 0,
+                attempts INTEGER DEFAULT 0,
+                claimed_at TIMESTAMP,  -- set while a worker is sending
+                next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
             
-            -- Insert sample data
-            INSERT OR IGNORE INTO events (title, description, date, time, location) VALUES
-                ('Community Outreach', 'Join us as we serve our local community with food and fellowship.', '2024-12-15', '10:00 AM', 'Church Parking Lot'),
-                ('Christmas Eve Service', 'Celebrate the birth of Christ with candlelight and carols.', '2024-12-24', '7:00 PM', 'Main Sanctuary'),
-                ('Youth Winter Retreat', 'A weekend of fun, fellowship, and spiritual growth for teens.', '2025-01-10', '6:00 PM', 'Mountain View Camp'),
-                ('New Year Prayer Meeting', 'Start the year with prayer and worship.', '2025-01-01', '10:00 PM', 'Prayer Room');
-            
-            INSERT OR IGNORE INTO services (day, time, type, description) VALUES
-                ('Sunday', '9:00 AM', 'Traditional', 'Traditional worship with hymns and organ music'),
-                ('Sunday', '11:00 AM', 'Contemporary', 'Modern worship with contemporary music'),
-                ('Wednesday', '7:00 PM', 'Bible Study', 'Mid-week Bible study and prayer meeting'),
-                ('Sunday', '10:00 AM', 'Sunday School', 'Classes for all ages');
-            
-            INSERT OR IGNORE INTO announcements (title, content, expiry_date) VALUES
-                ('Welcome to Our New Website!', 'We are excited to launch our new church website. Explore all the features and stay connected!', '2024-12-31'),
-                ('Christmas Schedule', 'Join us for special Christmas services throughout December. Check our events page for details.', '2024-12-26');
+            -- Rate limiting is kept in memory; drop the old table
+            DROP TABLE IF EXISTS rate_limits;
+        ''')
+        
+        # Phase 2: sample data, loaded in a single transaction and only
+        # into empty tables so repeated inits don't duplicate rows. The
+        # write lock is taken before the emptiness checks so workers
+        # starting together can't both see empty tables and seed twice.
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('SELECT 1 FROM events LIMIT 1').fetchone() is None:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO events (title, description, date, time, location) VALUES (?, ?, ?, ?, ?)',
+                    SEED_EVENTS
+                )
+            if conn.execute('SELECT 1 FROM services LIMIT 1').fetchone() is None:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO services (day, time, type, description) VALUES (?, ?, ?, ?)',
+                    SEED_SERVICES
+                )
+            if conn.execute('SELECT 1 FROM announcements LIMIT 1').fetchone() is None:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO announcements (title, content, expiry_date) VALUES (?, ?, ?)',
+                    SEED_ANNOUNCEMENTS
+                )
+        
+        # Phase 3: indexes, built after the bulk load
+        conn.executescript('''
+            -- Covers both the date filter and the ORDER BY date, time
+            DROP INDEX IF EXISTS idx_events_date;
+            CREATE INDEX IF NOT EXISTS idx_events_date_time ON events(date, time);
+            CREATE INDEX IF NOT EXISTS idx_contacts_email ON contacts(email);
+            CREATE INDEX IF NOT EXISTS idx_announcements_date ON announcements(date_posted);
+            CREATE INDEX IF NOT EXISTS idx_announcements_active ON announcements(is_active, expiry_date);
+            CREATE INDEX IF NOT EXISTS idx_newsletter_email ON newsletter(email);
         ''')
-        conn.commit()
+        
+        # Refresh planner statistics so the new indexes are used
+        conn.execute('ANALYZE')
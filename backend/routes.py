@@ -2,69 +2,171 @@
 API Routes for the Church Website
 """
 
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, current_app, request, jsonify, session
 from functools import wraps
+from werkzeug.security import check_password_hash
+import hmac
+import html
 import re
 import logging
-from datetime import datetime, timedelta
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from time import monotonic
 
+from .mailer import queue_mail
 from .models import get_db
 
 api = Blueprint('api', __name__)
 logger = logging.getLogger(__name__)
 
+# Columns returned by each endpoint
+EVENT_COLS = ('id', 'title', 'description', 'date', 'time', 'location', 'image_url')
+EVENT_DETAIL_COLS = EVENT_COLS + ('created_at', 'updated_at')
+SERVICE_COLS = ('id', 'day', 'time', 'type', 'description')
+ANNOUNCEMENT_COLS = ('id', 'title', 'content', 'date_posted', 'expiry_date')
+
+# Free-text payload fields passed through sanitize_input(), per endpoint
+EVENT_TEXT_FIELDS = ('title', 'description', 'time', 'location', 'image_url')
+SERVICE_TEXT_FIELDS = ('day', 'time', 'type', 'description')
+CONTACT_TEXT_FIELDS = ('name', 'subject', 'message')
+PRAYER_TEXT_FIELDS = ('name', 'request')
+ANNOUNCEMENT_TEXT_FIELDS = ('title', 'content')
+
+# Hot queries kept as constants so every call hits the statement cache
+SELECT_EVENT_SQL = 'SELECT ' + ', '.join(EVENT_DETAIL_COLS) + ' FROM events WHERE id = ?'
+NEWSLETTER_STATUS_SQL = 'SELECT is_active FROM newsletter WHERE email = ?'
+SUBSCRIBE_NEWSLETTER_SQL = 'INSERT INTO newsletter (email) VALUES (?) ON CONFLICT(email) DO NOTHING'
+REACTIVATE_NEWSLETTER_SQL = 'UPDATE newsletter SET is_active = 1 WHERE email = ? AND is_active = 0'
+
+# Recent request times per (ip_address, endpoint), oldest first
+_rate_limit_hits = defaultdict(deque)
+_rate_limit_lock = threading.Lock()
+_rate_limit_next_sweep = 0.0
+
+# Serialized GET responses per (endpoint, columns): (expires_at, body)
+_response_cache = {}
+
+# Bumped by every write to an endpoint's table, so a read that started
+# before the write can't cache its stale result afterwards
+_cache_generations = defaultdict(int)
+_cache_lock = threading.Lock()
+
+# Config snapshot taken once by configure() at app creation
+_RL_ENABLED = True
+_RL_PERIOD = 3600
+_RL_LIMIT = 100
+_MAIL_USER = None
+_CACHE_TTL = 60
+_MAX_PAYLOAD = 8192
+
+def configure(app):
+    """Cache hot-path config values as module globals"""
+    global _RL_ENABLED, _RL_PERIOD, _RL_LIMIT, _MAIL_USER, _CACHE_TTL, _MAX_PAYLOAD
+    _RL_ENABLED = app.config['RATE_LIMIT_ENABLED']
+    _RL_PERIOD = app.config['RATE_LIMIT_PERIOD']
+    _RL_LIMIT = app.config['RATE_LIMIT_REQUESTS']
+    _MAIL_USER = app.config['MAIL_USERNAME']
+    _CACHE_TTL = app.config['RESPONSE_CACHE_TTL']
+    _MAX_PAYLOAD = app.config['MAX_PAYLOAD_BYTES']
+
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_TAG_RE = re.compile(r'<[^<>]*>')
+
 def validate_email(email):
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.fullmatch(email) is not None
 
 def sanitize_input(text):
     """Sanitize user input to prevent XSS"""
     if text is None:
         return None
-    # Remove any HTML tags
-    clean = re.sub('<.*?>', '', str(text))
-    # Escape special characters
-    clean = clean.replace('&', '&amp;')
-    clean = clean.replace('<', '&lt;')
-    clean = clean.replace('>', '&gt;')
-    clean = clean.replace('"', '&quot;')
-    clean = clean.replace("'", '&#x27;')
-    return clean
+    # Remove any HTML tags, then escape special characters
+    return html.escape(_TAG_RE.sub('', str(text)), quote=True)
+
+def sanitize_fields(data, fields):
+    """Sanitize the given payload fields, returned in order as a tuple"""
+    return tuple(sanitize_input(data.get(field)) for field in fields)
+
+def json_payload():
+    """Parsed JSON object from the request body, or {} if it isn't one"""
+    data = request.get_json(cache=False, silent=True)
+    return data if isinstance(data, dict) else {}
+
+def utc_today():
+    """Today's UTC date as an ISO string, matching SQLite's date('now')"""
+    return datetime.now(timezone.utc).date().isoformat()
+
+def requested_fields(cols):
+    """Columns selected via the ?fields= query parameter, limited to cols"""
+    fields = request.args.get('fields')
+    if not fields:
+        return cols
+    wanted = set(fields.split(','))
+    return tuple(col for col in cols if col in wanted) or cols
+
+def rows_to_json(cols, rows):
+    """Serialize query rows straight to a JSON response"""
+    return current_app.json.response([dict(zip(cols, row)) for row in rows])
+
+def cached_rows_json(endpoint, cols, sql, params=()):
+    """JSON response for a read-mostly list query, cached for a short TTL"""
+    key = (endpoint, cols)
+    now = monotonic()
+    entry = _response_cache.get(key)
+    if entry is None or entry[0] <= now:
+        generation = _cache_generations[endpoint]
+        with get_db() as conn:
+            body = current_app.json.dumps([dict(zip(cols, row)) for row in conn.execute(sql, params)]).encode()
+        entry = (now + _CACHE_TTL, body)
+        with _cache_lock:
+            if _cache_generations[endpoint] == generation:
+                _response_cache[key] = entry
+    return current_app.response_class(entry[1], mimetype=current_app.json.mimetype)
+
+def invalidate_cache(endpoint):
+    """Drop cached responses for an endpoint after a write"""
+    with _cache_lock:
+        _cache_generations[endpoint] += 1
+        for key in list(_response_cache):
+            if key[0] == endpoint:
+                _response_cache.pop(key, None)
+
+def _sweep_rate_limits(cutoff):
+    """Drop rate limit buckets with no hits after cutoff (caller holds the lock)"""
+    for key in [k for k, hits in _rate_limit_hits.items() if not hits or hits[-1] <= cutoff]:
+        del _rate_limit_hits[key]
 
 def rate_limit(endpoint_name):
-    """Rate limiting decorator"""
+    """Rate limiting decorator (per-process sliding window)"""
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
-            from flask import current_app
-            if not current_app.config['RATE_LIMIT_ENABLED']:
+            if not _RL_ENABLED:
                 return f(*args, **kwargs)
             
-            ip_address = request.remote_addr
-            current_time = datetime.now()
-            time_window = current_time - timedelta(seconds=current_app.config['RATE_LIMIT_PERIOD'])
+            global _rate_limit_next_sweep
+            now = monotonic()
+            cutoff = now - _RL_PERIOD
             
-            with get_db() as conn:
-                # Clean old entries
-                conn.execute('DELETE FROM rate_limits WHERE timestamp < ?', (time_window,))
-                
-                # Count recent requests
-                count = conn.execute(
-                    'SELECT COUNT(*) FROM rate_limits WHERE ip_address = ? AND endpoint = ? AND timestamp > ?',
-                    (ip_address, endpoint_name, time_window)
-                ).fetchone()[0]
+            with _rate_limit_lock:
+                # Forget clients that have been idle for a whole window
+                if now >= _rate_limit_next_sweep:
+                    _sweep_rate_limits(cutoff)
+                    _rate_limit_next_sweep = now + _RL_PERIOD
                 
-                if count >= current_app.config['RATE_LIMIT_REQUESTS']:
-                    return jsonify({'error': 'Rate limit exceeded. Please try again later.'}), 429
+                # Drop hits that fell out of the window
+                hits = _rate_limit_hits[(request.remote_addr, endpoint_name)]
+                while hits and hits[0] <= cutoff:
+                    hits.popleft()
                 
-                # Log this request
-                conn.execute(
-                    'INSERT INTO rate_limits (ip_address, endpoint, timestamp) VALUES (?, ?, ?)',
-                    (ip_address, endpoint_name, current_time)
-                )
-                conn.commit()
+                limited = len(hits) >= _RL_LIMIT
+                if not limited:
+                    # Log this request
+                    hits.append(now)
             
+            if limited:
+                return jsonify({'error': 'Rate limit exceeded. Please try again later.'}), 429
             return f(*args, **kwargs)
         return wrapped
     return decorator
@@ -78,165 +180,173 @@ def admin_required(f):
         return f(*args, **kwargs)
     return wrapped
 
-@api.route('/events', methods=['GET', 'POST'])
-def handle_events():
-    """Get all events or create new event (admin only for POST)"""
-    if request.method == 'GET':
-        try:
-            with get_db() as conn:
-                # Get upcoming events
-                events = conn.execute(
-                    'SELECT * FROM events WHERE date >= date("now") ORDER BY date, time LIMIT 50'
-                ).fetchall()
-                
-                return jsonify([dict(event) for event in events])
-        except Exception as e:
-            logger.error(f"Error fetching events: {e}")
-            return jsonify({'error': 'Failed to fetch events'}), 500
-    
-    else:  # POST
-        if not session.get('is_admin'):
-            return jsonify({'error': 'Admin authentication required'}), 401
-        
-        try:
-            data = request.json
-            title = sanitize_input(data.get('title'))
-            description = sanitize_input(data.get('description'))
-            date = data.get('date')
-            time = sanitize_input(data.get('time'))
-            location = sanitize_input(data.get('location'))
-            image_url = sanitize_input(data.get('image_url'))
-            
-            if not title or not date:
-                return jsonify({'error': 'Title and date are required'}), 400
+@api.before_request
+def limit_payload_size():
+    """Reject oversized bodies before any handler parses them"""
+    if request.content_length and request.content_length > _MAX_PAYLOAD:
+        return jsonify({'error': 'Request payload too large'}), 413
+    # Chunked bodies have no Content-Length; MAX_CONTENT_LENGTH stops the
+    # read one byte past the cap, so a longer body was cut short
+    if request.content_length is None and request.method in ('POST', 'PUT'):
+        if len(request.get_data()) > _MAX_PAYLOAD:
+            return jsonify({'error': 'Request payload too large'}), 413
+
+@api.route('/events', methods=['GET'])
+def get_events():
+    """Get upcoming events"""
+    try:
+        with get_db() as conn:
+            # Get upcoming events
+            cols = requested_fields(EVENT_COLS)
+            cursor = conn.execute(
+                'SELECT ' + ', '.join(cols) + ' FROM events WHERE date >= ? ORDER BY date, time LIMIT 50',
+                (utc_today(),)
+            )
             
-            with get_db() as conn:
-                cursor = conn.execute(
-                    'INSERT INTO events (title, description, date, time, location, image_url) VALUES (?, ?, ?, ?, ?, ?)',
-                    (title, description, date, time, location, image_url)
-                )
-                conn.commit()
-                
-                return jsonify({'id': cursor.lastrowid, 'message': 'Event created successfully'}), 201
-        except Exception as e:
-            logger.error(f"Error creating event: {e}")
-            return jsonify({'error': 'Failed to create event'}), 500
-
-@api.route('/events/<int:event_id>', methods=['GET', 'PUT', 'DELETE'])
-def handle_event(event_id):
-    """Get, update, or delete specific event"""
-    if request.method == 'GET':
-        try:
-            with get_db() as conn:
-                event = conn.execute('SELECT * FROM events WHERE id = ?', (event_id,)).fetchone()
-                if event:
-                    return jsonify(dict(event))
-                return jsonify({'error': 'Event not found'}), 404
-        except Exception as e:
-            logger.error(f"Error fetching event {event_id}: {e}")
-            return jsonify({'error': 'Failed to fetch event'}), 500
-    
-    elif request.method == 'PUT':
-        if not session.get('is_admin'):
-            return jsonify({'error': 'Admin authentication required'}), 401
+            return rows_to_json(cols, cursor)
+    except Exception as e:
+        logger.error(f"Error fetching events: {e}")
+        return jsonify({'error': 'Failed to fetch events'}), 500
+
+@api.route('/events', methods=['POST'])
+@admin_required
+def create_event():
+    """Create new event (admin only)"""
+    try:
+        data = json_payload()
+        date = data.get('date')
         
-        try:
-            data = request.json
-            with get_db() as conn:
-                conn.execute(
-                    'UPDATE events SET title=?, description=?, date=?, time=?, location=?, image_url=?, updated_at=CURRENT_TIMESTAMP WHERE id=?',
-                    (sanitize_input(data.get('title')), sanitize_input(data.get('description')), 
-                     data.get('date'), sanitize_input(data.get('time')), 
-                     sanitize_input(data.get('location')), sanitize_input(data.get('image_url')), event_id)
-                )
-                conn.commit()
-                return jsonify({'message': 'Event updated successfully'})
-        except Exception as e:
-            logger.error(f"Error updating event {event_id}: {e}")
-            return jsonify({'error': 'Failed to update event'}), 500
-    
-    else:  # DELETE
-        if not session.get('is_admin'):
-            return jsonify({'error': 'Admin authentication required'}), 401
+        # Reject incomplete payloads before sanitizing anything
+        if not data.get('title') or not date:
+            return jsonify({'error': 'Title and date are required'}), 400
         
-        try:
-            with get_db() as conn:
-                conn.execute('DELETE FROM events WHERE id = ?', (event_id,))
-                conn.commit()
-                return jsonify({'message': 'Event deleted successfully'})
-        except Exception as e:
-            logger.error(f"Error deleting event {event_id}: {e}")
-            return jsonify({'error': 'Failed to delete event'}), 500
-
-@api.route('/services', methods=['GET', 'POST'])
-def handle_services():
-    """Get or update service times"""
-    if request.method == 'GET':
-        try:
-            with get_db() as conn:
-                services = conn.execute('SELECT * FROM services ORDER BY id').fetchall()
-                return jsonify([dict(service) for service in services])
-        except Exception as e:
-            logger.error(f"Error fetching services: {e}")
-            return jsonify({'error': 'Failed to fetch services'}), 500
-    
-    else:  # POST (admin only)
-        if not session.get('is_admin'):
-            return jsonify({'error': 'Admin authentication required'}), 401
+        title, description, time, location, image_url = sanitize_fields(data, EVENT_TEXT_FIELDS)
+        if not title:
+            return jsonify({'error': 'Title and date are required'}), 400
         
-        try:
-            data = request.json
-            with get_db() as conn:
-                cursor = conn.execute(
-                    'INSERT INTO services (day, time, type, description) VALUES (?, ?, ?, ?)',
-                    (sanitize_input(data.get('day')), sanitize_input(data.get('time')), 
-                     sanitize_input(data.get('type')), sanitize_input(data.get('description')))
-                )
-                conn.commit()
-                return jsonify({'id': cursor.lastrowid, 'message': 'Service time added successfully'}), 201
-        except Exception as e:
-            logger.error(f"Error adding service: {e}")
-            return jsonify({'error': 'Failed to add service'}), 500
+        with get_db() as conn:
+            event_id = conn.execute(
+                'INSERT INTO events (title, description, date, time, location, image_url) VALUES (?, ?, ?, ?, ?, ?) RETURNING id',
+                (title, description, date, time, location, image_url)
+            ).fetchone()[0]
+            conn.commit()
+            
+            return jsonify({'id': event_id, 'message': 'Event created successfully'}), 201
+    except Exception as e:
+        logger.error(f"Error creating event: {e}")
+        return jsonify({'error': 'Failed to create event'}), 500
+
+@api.route('/events/<int:event_id>', methods=['GET'])
+def get_event(event_id):
+    """Get specific event"""
+    try:
+        with get_db() as conn:
+            event = conn.execute(SELECT_EVENT_SQL, (event_id,)).fetchone()
+            if event:
+                return jsonify(dict(zip(EVENT_DETAIL_COLS, event)))
+            return jsonify({'error': 'Event not found'}), 404
+    except Exception as e:
+        logger.error(f"Error fetching event {event_id}: {e}")
+        return jsonify({'error': 'Failed to fetch event'}), 500
+
+@api.route('/events/<int:event_id>', methods=['PUT'])
+@admin_required
+def update_event(event_id):
+    """Update specific event (admin only)"""
+    try:
+        data = json_payload()
+        title, description, time, location, image_url = sanitize_fields(data, EVENT_TEXT_FIELDS)
+        with get_db() as conn:
+            conn.execute(
+                'UPDATE events SET title=?, description=?, date=?, time=?, location=?, image_url=?, updated_at=CURRENT_TIMESTAMP WHERE id=?',
+                (title, description, data.get('date'), time, location, image_url, event_id)
+            )
+            conn.commit()
+            return jsonify({'message': 'Event updated successfully'})
+    except Exception as e:
+        logger.error(f"Error updating event {event_id}: {e}")
+        return jsonify({'error': 'Failed to update event'}), 500
+
+@api.route('/events/<int:event_id>', methods=['DELETE'])
+@admin_required
+def delete_event(event_id):
+    """Delete specific event (admin only)"""
+    try:
+        with get_db() as conn:
+            conn.execute('DELETE FROM events WHERE id = ?', (event_id,))
+            conn.commit()
+            return jsonify({'message': 'Event deleted successfully'})
+    except Exception as e:
+        logger.error(f"Error deleting event {event_id}: {e}")
+        return jsonify({'error': 'Failed to delete event'}), 500
+
+@api.route('/services', methods=['GET'])
+def get_services():
+    """Get service times"""
+    try:
+        cols = requested_fields(SERVICE_COLS)
+        return cached_rows_json(
+            'services', cols, 'SELECT ' + ', '.join(cols) + ' FROM services ORDER BY id'
+        )
+    except Exception as e:
+        logger.error(f"Error fetching services: {e}")
+        return jsonify({'error': 'Failed to fetch services'}), 500
+
+@api.route('/services', methods=['POST'])
+@admin_required
+def create_service():
+    """Add service time (admin only)"""
+    try:
+        data = json_payload()
+        with get_db() as conn:
+            service_id = conn.execute(
+                'INSERT INTO services (day, time, type, description) VALUES (?, ?, ?, ?) RETURNING id',
+                sanitize_fields(data, SERVICE_TEXT_FIELDS)
+            ).fetchone()[0]
+            conn.commit()
+            invalidate_cache('services')
+            return jsonify({'id': service_id, 'message': 'Service time added successfully'}), 201
+    except Exception as e:
+        logger.error(f"Error adding service: {e}")
+        return jsonify({'error': 'Failed to add service'}), 500
 
 @api.route('/contact', methods=['POST'])
 @rate_limit('contact')
 def handle_contact():
     """Submit contact form"""
     try:
-        data = request.json
-        name = sanitize_input(data.get('name'))
+        data = json_payload()
         email = data.get('email')
-        subject = sanitize_input(data.get('subject'))
-        message = sanitize_input(data.get('message'))
         
-        # Validation
-        if not all([name, email, message]):
+        # Validation (on the raw payload, before sanitizing anything)
+        if not all([data.get('name'), email, data.get('message')]):
             return jsonify({'error': 'Name, email, and message are required'}), 400
         
         if not validate_email(email):
             return jsonify({'error': 'Invalid email address'}), 400
         
+        name, subject, message = sanitize_fields(data, CONTACT_TEXT_FIELDS)
+        if not name or not message:
+            return jsonify({'error': 'Name, email, and message are required'}), 400
+        
+        mail_id = None
         with get_db() as conn:
             conn.execute(
                 'INSERT INTO contacts (name, email, subject, message) VALUES (?, ?, ?, ?)',
                 (name, email, subject, message)
             )
-            conn.commit()
-        
-        # Send email notification (if configured)
-        try:
-            from flask_mail import Message
-            from flask import current_app
-            mail = current_app.extensions.get('mail')
-            if mail and current_app.config['MAIL_USERNAME']:
-                msg = Message(
+            # Email notification (if configured) is sent by the mail worker
+            if _MAIL_USER:
+                mail_id = queue_mail(
+                    conn,
                     f'New Contact Form Submission: {subject or "No Subject"}',
-                    recipients=['info@gracecommunitychurch.org'],
-                    body=f'From: {name} ({email})\n\nMessage:\n{message}'
+                    ['info@gracecommunitychurch.org'],
+                    f'From: {name} ({email})\n\nMessage:\n{message}'
                 )
-                mail.send(msg)
-        except Exception as e:
-            logger.warning(f"Failed to send email notification: {e}")
+            conn.commit()
+        
+        if mail_id is not None:
+            current_app.extensions['mail_queue'].put(mail_id)
         
         return jsonify({'message': 'Contact form submitted successfully'}), 201
     except Exception as e:
@@ -248,18 +358,21 @@ def handle_contact():
 def handle_prayer_request():
     """Submit prayer request"""
     try:
-        data = request.json
-        name = sanitize_input(data.get('name'))
+        data = json_payload()
         email = data.get('email')
-        request_text = sanitize_input(data.get('request'))
         is_anonymous = data.get('is_anonymous', False)
         
-        if not request_text:
+        # Validation (on the raw payload, before sanitizing anything)
+        if not data.get('request'):
             return jsonify({'error': 'Prayer request is required'}), 400
         
         if email and not validate_email(email):
             return jsonify({'error': 'Invalid email address'}), 400
         
+        name, request_text = sanitize_fields(data, PRAYER_TEXT_FIELDS)
+        if not request_text:
+            return jsonify({'error': 'Prayer request is required'}), 400
+        
         with get_db() as conn:
             conn.execute(
                 'INSERT INTO prayer_requests (name, email, request, is_anonymous) VALUES (?, ?, ?, ?)',
@@ -272,71 +385,77 @@ def handle_prayer_request():
         logger.error(f"Error submitting prayer request: {e}")
         return jsonify({'error': 'Failed to submit prayer request'}), 500
 
-@api.route('/announcements', methods=['GET', 'POST'])
-def handle_announcements():
-    """Get announcements or create new (admin only for POST)"""
-    if request.method == 'GET':
-        try:
-            with get_db() as conn:
-                announcements = conn.execute(
-                    'SELECT * FROM announcements WHERE is_active = 1 AND (expiry_date IS NULL OR expiry_date >= date("now")) ORDER BY date_posted DESC LIMIT 10'
-                ).fetchall()
-                return jsonify([dict(ann) for ann in announcements])
-        except Exception as e:
-            logger.error(f"Error fetching announcements: {e}")
-            return jsonify({'error': 'Failed to fetch announcements'}), 500
-    
-    else:  # POST
-        if not session.get('is_admin'):
-            return jsonify({'error': 'Admin authentication required'}), 401
+@api.route('/announcements', methods=['GET'])
+def get_announcements():
+    """Get active announcements"""
+    try:
+        cols = requested_fields(ANNOUNCEMENT_COLS)
+        return cached_rows_json(
+            'announcements', cols,
+            'SELECT ' + ', '.join(cols) + ' FROM announcements WHERE is_active = 1 AND (expiry_date IS NULL OR expiry_date >= ?) ORDER BY date_posted DESC LIMIT 10',
+            (utc_today(),)
+        )
+    except Exception as e:
+        logger.error(f"Error fetching announcements: {e}")
+        return jsonify({'error': 'Failed to fetch announcements'}), 500
+
+@api.route('/announcements', methods=['POST'])
+@admin_required
+def create_announcement():
+    """Create new announcement (admin only)"""
+    try:
+        data = json_payload()
+        expiry_date = data.get('expiry_date')
         
-        try:
-            data = request.json
-            title = sanitize_input(data.get('title'))
-            content = sanitize_input(data.get('content'))
-            expiry_date = data.get('expiry_date')
-            
-            if not title or not content:
-                return jsonify({'error': 'Title and content are required'}), 400
-            
-            with get_db() as conn:
-                cursor = conn.execute(
-                    'INSERT INTO announcements (title, content, expiry_date) VALUES (?, ?, ?)',
-                    (title, content, expiry_date)
-                )
-                conn.commit()
-                return jsonify({'id': cursor.lastrowid, 'message': 'Announcement created successfully'}), 201
-        except Exception as e:
-            logger.error(f"Error creating announcement: {e}")
-            return jsonify({'error': 'Failed to create announcement'}), 500
+        # Reject incomplete payloads before sanitizing anything
+        if not data.get('title') or not data.get('content'):
+            return jsonify({'error': 'Title and content are required'}), 400
+        
+        title, content = sanitize_fields(data, ANNOUNCEMENT_TEXT_FIELDS)
+        if not title or not content:
+            return jsonify({'error': 'Title and content are required'}), 400
+        
+        with get_db() as conn:
+            announcement_id = conn.execute(
+                'INSERT INTO announcements (title, content, expiry_date) VALUES (?, ?, ?) RETURNING id',
+                (title, content, expiry_date)
+            ).fetchone()[0]
+            conn.commit()
+            invalidate_cache('announcements')
+            return jsonify({'id': announcement_id, 'message': 'Announcement created successfully'}), 201
+    except Exception as e:
+        logger.error(f"Error creating announcement: {e}")
+        return jsonify({'error': 'Failed to create announcement'}), 500
 
 @api.route('/newsletter', methods=['POST'])
 @rate_limit('newsletter')
 def handle_newsletter():
     """Subscribe to newsletter"""
     try:
-        data = request.json
+        data = json_payload()
         email = data.get('email')
         
         if not email or not validate_email(email):
             return jsonify({'error': 'Valid email address is required'}), 400
         
         with get_db() as conn:
-            # Check if already subscribed
-            existing = conn.execute('SELECT * FROM newsletter WHERE email = ?', (email,)).fetchone()
-            
-            if existing:
-                if existing['is_active']:
-                    return jsonify({'message': 'Email already subscribed'}), 200
-                else:
-                    # Reactivate subscription
-                    conn.execute('UPDATE newsletter SET is_active = 1 WHERE email = ?', (email,))
+            # Active subscribers are answered from a read, without a write lock
+            existing = conn.execute(NEWSLETTER_STATUS_SQL, (email,)).fetchone()
+            if existing is None or not existing[0]:
+                # Insert unless a concurrent request got there first
+                if conn.execute(SUBSCRIBE_NEWSLETTER_SQL, (email,)).rowcount:
+                    conn.commit()
+                    return jsonify({'message': 'Successfully subscribed to newsletter'}), 201
+                
+                # Reactivate subscription if it was cancelled
+                if conn.execute(REACTIVATE_NEWSLETTER_SQL, (email,)).rowcount:
                     conn.commit()
                     return jsonify({'message': 'Subscription reactivated successfully'}), 200
-            else:
-                conn.execute('INSERT INTO newsletter (email) VALUES (?)', (email,))
-                conn.commit()
-                return jsonify({'message': 'Successfully subscribed to newsletter'}), 201
+                
+                # Lost the race to another request; release the write lock
+                conn.rollback()
+            
+            return jsonify({'message': 'Email already subscribed'}), 200
     except Exception as e:
         logger.error(f"Error subscribing to newsletter: {e}")
         return jsonify({'error': 'Failed to subscribe to newsletter'}), 500
@@ -345,11 +464,14 @@ def handle_newsletter():
 def admin_login():
     """Admin login endpoint"""
     try:
-        data = request.json
-        username = data.get('username')
-        password = data.get('password')
+        data = json_payload()
+        username = str(data.get('username') or '')
+        password = str(data.get('password') or '')
         
-        if username == session.get('ADMIN_USERNAME') and password == session.get('ADMIN_PASSWORD'):
+        # Constant-time comparisons against the configured credentials
+        username_ok = hmac.compare_digest(username.encode(), current_app.config['ADMIN_USERNAME'].encode())
+        password_ok = check_password_hash(current_app.config['ADMIN_PASSWORD_HASH'], password)
+        if username_ok and password_ok:
             session['is_admin'] = True
             return jsonify({'message': 'Login successful'}), 200
         